@@ -1,145 +1,242 @@
 import streamlit as st
-import tabula
-import pandas as pd
 import io
+import os
 import zipfile
-import subprocess
+import hashlib
+import threading
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
-# ----------------------- #
-# Streamlit Page Settings #
-# ----------------------- #
-st.set_page_config(
-    page_title="📄 PDF to Excel Converter",
-    page_icon="📑",
-    layout="centered"
-)
-
-st.title("📄 PDF to Excel Converter")
-st.markdown(
-    """
-    Upload one or more **PDF files** and convert them into **Excel spreadsheets** automatically.  
-    The app detects and extracts all tables — even from unstructured PDFs — and saves each one into a separate Excel sheet.  
-    """
-)
+from converter import convert_pdf_to_excel
 
 # ----------------------- #
 # Utility Functions       #
 # ----------------------- #
 
-def check_java():
-    """Verify that Java is installed (required for tabula)."""
-    try:
-        subprocess.run(["java", "-version"], check=True, capture_output=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+CACHE_MAX_ENTRIES = 64
+CACHE_MAX_BYTES = 256 * 1024 * 1024
 
 
-def convert_pdf_to_excel(pdf_file):
+@st.cache_resource
+def get_pool():
     """
-    Reads tables from a PDF and returns a BytesIO buffer containing the Excel file.
-    Automatically switches between lattice and stream modes for best results.
+    Lazily create one process pool shared across reruns.
+    Uses `spawn` so workers don't inherit Streamlit's threads.
     """
-    buffer = io.BytesIO()
+    return ProcessPoolExecutor(
+        max_workers=min(os.cpu_count() or 1, 4),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
 
-    if not check_java():
-        st.error("🚫 Java is not installed or not configured correctly.")
-        st.info("If you're deploying on Streamlit Cloud, add a `packages.txt` file containing:\n`openjdk-11-jdk`")
-        return None
 
-    try:
-        # Try lattice mode first (for bordered tables)
-        try:
-            tables = tabula.read_pdf(pdf_file, pages="all", multiple_tables=True, lattice=True)
-        except Exception:
-            tables = []
-
-        # If no tables found, try stream mode
-        if not tables:
-            tables = tabula.read_pdf(pdf_file, pages="all", multiple_tables=True, stream=True)
-
-        # Handle empty case
-        if not tables:
-            st.warning(f"No tables detected in `{pdf_file.name}`. Creating a blank Excel file.")
-            tables = [pd.DataFrame({"Message": ["No tables found in PDF."]})]
-
-        # Write all tables to Excel
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            for i, df in enumerate(tables):
-                df = df.dropna(how="all").dropna(how="all", axis=1)
-                if not df.empty:
-                    df.to_excel(writer, sheet_name=f"Table_{i+1}", index=False)
-
-        buffer.seek(0)
-        return buffer
-
-    except Exception as e:
-        st.error(f"⚠️ Error processing `{pdf_file.name}`: {e}")
-        df_err = pd.DataFrame({"Error": [str(e)]})
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df_err.to_excel(writer, sheet_name="Error", index=False)
-        buffer.seek(0)
-        return buffer
+@st.cache_resource
+def get_result_cache():
+    """
+    Conversion results keyed by the PDF's blake2b digest (plus options),
+    shared by all sessions so re-uploading a document skips extraction.
+    Bounded by CACHE_MAX_ENTRIES and CACHE_MAX_BYTES of workbook data.
+    """
+    return collections.OrderedDict(), threading.Lock()
 
 
-# ----------------------- #
-# File Upload Section     #
-# ----------------------- #
-uploaded_files = st.file_uploader(
-    "📂 Choose one or more PDF files",
-    type="pdf",
-    accept_multiple_files=True,
-    help="You can upload multiple PDFs; the app will combine results into a ZIP file."
-)
-
-if st.button("🚀 Convert to Excel"):
-    if not uploaded_files:
-        st.warning("Please upload at least one PDF to start conversion.")
-    else:
-        with st.spinner("Processing your PDFs..."):
-            excel_files = {}
-            for pdf in uploaded_files:
-                result = convert_pdf_to_excel(pdf)
-                if result:
-                    excel_files[pdf.name.replace(".pdf", ".xlsx")] = result.getvalue()
-
-        # ----------------------- #
-        # Download Section        #
-        # ----------------------- #
-        if excel_files:
-            st.success("✅ Conversion complete!")
-
-            if len(excel_files) == 1:
-                name, data = list(excel_files.items())[0]
-                st.download_button(
-                    label=f"📥 Download {name}",
-                    data=data,
-                    file_name=name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-            else:
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    for name, data in excel_files.items():
-                        zipf.writestr(name, data)
-                st.download_button(
-                    label="📦 Download All as ZIP",
-                    data=zip_buffer.getvalue(),
-                    file_name="converted_pdfs.zip",
-                    mime="application/zip"
-                )
+def cache_get(key):
+    results, lock = get_result_cache()
+    with lock:
+        if key not in results:
+            return None
+        results.move_to_end(key)
+        return results[key]
 
 
-# ----------------------- #
-# Footer / Info Section   #
-# ----------------------- #
-st.markdown("---")
-st.markdown(
+def cache_put(key, result):
+    """Remember `result`, evicting the oldest entries past the count or size limit."""
+    if len(result[0]) > CACHE_MAX_BYTES:
+        return
+    results, lock = get_result_cache()
+    with lock:
+        results[key] = result
+        results.move_to_end(key)
+        total = sum(len(data) for data, _ in results.values())
+        while len(results) > CACHE_MAX_ENTRIES or total > CACHE_MAX_BYTES:
+            _, (data, _) = results.popitem(last=False)
+            total -= len(data)
+
+
+def submit_conversion(pdf_bytes, infer_types):
+    """
+    Queue one PDF on the shared pool. If the pool broke while idle (or in
+    another session's batch), replace it and try once more.
+    """
+    try:
+        return get_pool().submit(convert_pdf_to_excel, pdf_bytes, infer_types)
+    except BrokenProcessPool:
+        get_pool.clear()
+        return get_pool().submit(convert_pdf_to_excel, pdf_bytes, infer_types)
+
+
+def iter_conversions(files, infer_types):
+    """
+    Yield `(name, result)` for each upload: cache hits first, then pool jobs
+    as they finish. A file whose worker died comes back as `(None, notice)`.
+    """
+    futures = {}
+    for f in files:
+        pdf_bytes = f.getvalue()
+        key = (hashlib.blake2b(pdf_bytes).hexdigest(), infer_types)
+        cached = cache_get(key)
+        if cached:
+            yield f.name, cached
+        else:
+            futures[submit_conversion(pdf_bytes, infer_types)] = (f.name, key)
+
+    try:
+        for fut in as_completed(futures):
+            name, key = futures[fut]
+            try:
+                result = fut.result()
+            except BrokenProcessPool:
+                # A worker crashed or was killed; the executor can't run anything
+                # else, so drop it and let the next conversion start a fresh one
+                get_pool.clear()
+                yield name, (None, ("error", "the conversion process stopped unexpectedly. Please try again."))
+                continue
+            # The converter turns every exception into an "error" notice, including
+            # transient ones (MemoryError, a full temp dir), so don't remember those
+            notice = result[1]
+            if not notice or notice[0] != "error":
+                cache_put(key, result)
+            yield name, result
+    finally:
+        # A rerun (e.g. clicking Convert again) abandons this generator; don't
+        # leave its queued jobs occupying the shared pool
+        for fut in futures:
+            fut.cancel()
+
+
+def unique_name(name, taken):
+    """`name`, or `name (2)`, `name (3)`… if it's already in `taken`; records the result."""
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{stem} ({n}){ext}"
+    taken.add(candidate)
+    return candidate
+
+
+def main():
     """
-    ### ℹ️ About
-    - Extracts tables from any PDF (bordered or unbordered).  
-    - Each table is exported to a new Excel sheet.  
-    - Built using **Streamlit** + **tabula-py** + **pandas**.  
+    The page itself. Kept out of module scope because spawn workers re-run
+    this file as `__mp_main__` (Streamlit registers it as `__main__`), and
+    they must not render the UI.
     """
-)
-st.caption("Built with ❤️ by Lahiru • Powered by Streamlit + tabula-py")
+    # ----------------------- #
+    # Streamlit Page Settings #
+    # ----------------------- #
+    st.set_page_config(
+        page_title="📄 PDF to Excel Converter",
+        page_icon="📑",
+        layout="centered"
+    )
+
+    st.title("📄 PDF to Excel Converter")
+    st.markdown(
+        """
+        Upload one or more **PDF files** and convert them into **Excel spreadsheets** automatically.  
+        The app detects and extracts all tables — even from unstructured PDFs — and saves each one into a separate Excel sheet.  
+        """
+    )
+
+    # ----------------------- #
+    # File Upload Section     #
+    # ----------------------- #
+    uploaded_files = st.file_uploader(
+        "📂 Choose one or more PDF files",
+        type="pdf",
+        accept_multiple_files=True,
+        help="You can upload multiple PDFs; the app will combine results into a ZIP file."
+    )
+
+    infer_types = st.checkbox(
+        "🔢 Detect numeric columns",
+        help="Parse tables with pandas so numbers are stored as numbers. Slower; by default cells are kept as text."
+    )
+
+    if st.button("🚀 Convert to Excel"):
+        if not uploaded_files:
+            st.warning("Please upload at least one PDF to start conversion.")
+        else:
+            # A single upload is offered as-is; several are written into the ZIP
+            # as they finish instead of being collected in a dict first. (The
+            # result cache may still hold its own copy of each workbook.)
+            # xlsx files are already deflated, so they are stored without recompressing.
+            single = len(uploaded_files) == 1
+            single_file = None
+            converted = 0
+            zip_names = set()
+            zip_buffer = io.BytesIO()
+
+            with st.spinner("Processing your PDFs..."), \
+                    zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_STORED) as zipf:
+                for name, result in iter_conversions(uploaded_files, infer_types):
+                    data, notice = result
+                    if notice:
+                        kind, detail = notice
+                        if kind == "empty":
+                            st.warning(f"No tables detected in `{name}`. Creating a blank Excel file.")
+                        else:
+                            st.error(f"⚠️ Error processing `{name}`: {detail}")
+                    if data is None:
+                        continue
+                    xlsx_name = name.replace(".pdf", ".xlsx")
+                    if single:
+                        single_file = (xlsx_name, data)
+                    else:
+                        # Two uploads can share a name (or map to the same .xlsx)
+                        zipf.writestr(unique_name(xlsx_name, zip_names), data)
+                    converted += 1
+
+            # ----------------------- #
+            # Download Section        #
+            # ----------------------- #
+            if converted:
+                st.success("✅ Conversion complete!")
+
+                if single:
+                    name, data = single_file
+                    st.download_button(
+                        label=f"📥 Download {name}",
+                        data=data,
+                        file_name=name,
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                else:
+                    # Streamlit copies the buffer to bytes either way (getvalue() on
+                    # a BytesIO; getbuffer()'s memoryview is rejected), so no copy
+                    # can be saved here
+                    st.download_button(
+                        label="📦 Download All as ZIP",
+                        data=zip_buffer,
+                        file_name="converted_pdfs.zip",
+                        mime="application/zip"
+                    )
+
+    # ----------------------- #
+    # Footer / Info Section   #
+    # ----------------------- #
+    st.markdown("---")
+    st.markdown(
+        """
+        ### ℹ️ About
+        - Extracts tables from any PDF (bordered or unbordered).  
+        - Each table is exported to a new Excel sheet.  
+        - Built using **Streamlit** + **PyMuPDF** + **pandas**.  
+        """
+    )
+    st.caption("Built with ❤️ by Lahiru • Powered by Streamlit + PyMuPDF")
+
+
+if __name__ == "__main__":
+    main()
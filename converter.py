@@ -0,0 +1,220 @@
+"""
+PDF → Excel conversion.
+Kept free of Streamlit so it can run inside worker processes.
+"""
+import contextlib
+import io
+import itertools
+
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+import pyarrow as pa
+import pymupdf
+
+ARROW_BATCH_ROWS = 10_000
+# Ruling segments in the document needed to treat a PDF as bordered
+MIN_RULING_SEGMENTS = 6
+
+
+def _to_number(col):
+    """Convert a column to numbers if every non-blank cell parses, else leave it as text."""
+    try:
+        return pd.to_numeric(col)
+    except (ValueError, TypeError):
+        return col
+
+
+def _iter_tables(doc, infer_types, strategy):
+    """
+    Yield the tables on each page with PyMuPDF's `find_tables`, page by page,
+    so a page is only extracted once the previous page's tables are written.
+    With `infer_types` tables come back as DataFrames with numeric columns
+    parsed; otherwise as plain lists of cell strings, skipping pandas entirely.
+    """
+    for page in doc:
+        for table in page.find_tables(strategy=strategy).tables:
+            if infer_types:
+                df = table.to_pandas()
+                df = df.where(df.ne(""))
+                yield df.apply(_to_number)
+            else:
+                rows = table.extract()
+                if table.header.external:
+                    rows.insert(0, table.header.names)
+                yield rows
+
+
+def _detect_strategy(doc):
+    """
+    Guess "lines" (bordered tables) or "text" from the horizontal and
+    vertical segments drawn anywhere in the document, so most PDFs need one
+    pass. Every page counts: "text" also "finds" tables in plain prose, so a
+    ruled table after a text-only cover page must still select "lines".
+    `get_drawings` is far cheaper than `find_tables`, and the scan stops as
+    soon as enough segments are seen.
+    """
+    segments = 0
+    for page in doc:
+        for drawing in page.get_drawings():
+            for item in drawing["items"]:
+                if item[0] == "re":
+                    segments += 4
+                elif item[0] == "l" and (item[1].x == item[2].x or item[1].y == item[2].y):
+                    segments += 1
+            if segments >= MIN_RULING_SEGMENTS:
+                return "lines"
+    return "text"
+
+
+def _first_strategy_with_tables(doc, infer_types):
+    """Table iterator for the first strategy that finds anything, or None."""
+    # The detected strategy first; the other one only if it finds nothing
+    detected = _detect_strategy(doc)
+    fallback = "text" if detected == "lines" else "lines"
+    for strategy in (detected, fallback):
+        tables = _iter_tables(doc, infer_types, strategy)
+        first = next(tables, None)
+        if first is not None:
+            return itertools.chain([first], tables)
+    return None
+
+
+def _drop_empty(df):
+    """Drop all-NaN rows and columns with one mask instead of two dropna passes."""
+    na = df.isna().to_numpy()
+    # Well-formed tables have no gaps at all; skip the copy for them
+    if not na.any():
+        return df
+    return df.iloc[~na.all(axis=1), ~na.all(axis=0)]
+
+
+def _frame_rows(df):
+    """
+    Header row, then the values of `df` with blank cells rather than NaN
+    (like `df.to_excel`). Values are converted a column at a time through
+    Arrow, which is much faster than walking pandas object columns per cell.
+    """
+    df = _drop_empty(df)
+    if df.empty:
+        return None
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return itertools.chain(
+        [[str(c) for c in df.columns]],
+        _arrow_rows(table),
+    )
+
+
+def _arrow_rows(table):
+    """Yield row tuples from `table`, one record batch at a time."""
+    for batch in table.to_batches(max_chunksize=ARROW_BATCH_ROWS):
+        yield from zip(*(col.to_pylist() for col in batch.columns))
+
+
+def _text_rows(rows):
+    """
+    Drop blank data rows, and columns with nothing below the header (as
+    `_drop_empty` does for DataFrames); None if no data rows are left.
+    """
+    if len(rows) < 2:
+        return None
+    header, data = rows[0], rows[1:]
+    if all(row and all(row) for row in data):
+        return rows
+    data = [row for row in data if any(row)]
+    if not data:
+        return None
+    keep = [any(col) for col in zip(*data)]
+    return [[cell for cell, k in zip(row, keep) if k] for row in [header, *data]]
+
+
+def _clean_cell(value):
+    """Strip control characters openpyxl refuses to write (xlsxwriter escaped them)."""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def _append_sheet(wb, sheet_name, rows):
+    """
+    Stream `rows` into a new sheet of a write-only workbook.
+    openpyxl's write-only mode flushes rows as they are appended instead of
+    holding the whole cell grid in memory.
+    """
+    ws = wb.create_sheet(sheet_name)
+    try:
+        for row in rows:
+            ws.append([_clean_cell(value) for value in row])
+    except Exception:
+        # A half-written sheet would pass for a complete table (or corrupt
+        # the file without lxml), so leave it out entirely
+        wb.remove(ws)
+        _discard_sheet_file(ws)
+        raise
+
+
+def _discard_sheet_file(ws):
+    """
+    Delete a dropped write-only sheet's temp file now; openpyxl only removes
+    them at interpreter exit, and pool workers are long-lived.
+    """
+    writer = ws._writer
+    if writer is None:
+        return
+    # The XML stream may already be broken by the failed append
+    with contextlib.suppress(Exception):
+        writer.close()
+    with contextlib.suppress(OSError, ValueError):
+        writer.cleanup()
+
+
+def _workbook_bytes(wb):
+    if not wb.worksheets:
+        wb.create_sheet("Sheet1")
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _build_empty_workbook():
+    wb = openpyxl.Workbook(write_only=True)
+    _append_sheet(wb, "Table_1", [["Message"], ["No tables found in PDF."]])
+    return _workbook_bytes(wb)
+
+
+# Every PDF without tables gets the same file, so build it once at import
+_EMPTY_XLSX_BYTES = _build_empty_workbook()
+
+
+def convert_pdf_to_excel(pdf_bytes, infer_types=False):
+    """
+    Reads tables from a PDF and returns `(excel_bytes, notice)`.
+    `notice` is None, `("empty", None)` or `("error", message)`; it doesn't
+    mention the file, so results can be reused for identical uploads.
+    Cells are written as text unless `infer_types` asks pandas to parse them.
+    Automatically switches between ruled-line and text-alignment detection.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    notice = None
+    to_rows = _frame_rows if infer_types else _text_rows
+
+    try:
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            tables = _first_strategy_with_tables(doc, infer_types)
+
+            # Handle empty case
+            if tables is None:
+                return _EMPTY_XLSX_BYTES, ("empty", None)
+
+            # Write tables to Excel as they are extracted
+            for i, rows in enumerate(map(to_rows, tables)):
+                if rows is not None:
+                    _append_sheet(wb, f"Table_{i+1}", rows)
+
+    except Exception as e:
+        # Keep the tables written so far and report the failure in its own sheet
+        message = str(e) or repr(e)
+        notice = ("error", message)
+        _append_sheet(wb, "Error", [["Error"], [message]])
+
+    return _workbook_bytes(wb), notice